@@ -1,14 +1,18 @@
 """Bu dosya tüm crawler sürecini çalıştırır ve PDF çıktılarını yönetir."""
 import argparse
 import asyncio
+import concurrent.futures
+import concurrent.futures.thread
 from datetime import datetime, timezone
+import logging
 import os
 import shutil
 import sys
+import threading
 import warnings
 from pathlib import Path
 from typing import Optional
-from playwright.async_api import async_playwright
+from playwright.async_api import Page, async_playwright
 
 # Suppress asyncio warnings about unclosed loops
 warnings.filterwarnings('ignore', category=RuntimeWarning, message='.*coroutine.*was never awaited')
@@ -17,6 +21,14 @@ warnings.filterwarnings('ignore', category=RuntimeWarning, message='.*unclosed.*
 # Store original exception hook
 _original_excepthook = sys.excepthook
 
+# Modules whose shutdown-time exceptions are suppressed
+_SUPPRESS_FILES = frozenset({
+    threading.__file__,
+    concurrent.futures.__file__,
+    concurrent.futures._base.__file__,
+    concurrent.futures.thread.__file__,
+})
+
 def _quiet_excepthook(exc_type, exc_value, exc_traceback):
     """Suppress certain exceptions during shutdown."""
     # Suppress KeyboardInterrupt exceptions during shutdown
@@ -37,9 +49,8 @@ def _quiet_excepthook(exc_type, exc_value, exc_traceback):
     if exc_traceback:
         frame = exc_traceback
         while frame:
-            filename = frame.tb_frame.f_code.co_filename
             # Suppress exceptions from threading.py and concurrent/futures during shutdown
-            if 'threading.py' in filename or 'concurrent/futures' in filename:
+            if frame.tb_frame.f_code.co_filename in _SUPPRESS_FILES:
                 if exc_type is KeyboardInterrupt or 'shutdown' in str(exc_value).lower():
                     return
             frame = frame.tb_next
@@ -50,19 +61,23 @@ def _quiet_excepthook(exc_type, exc_value, exc_traceback):
 # Set custom exception hook
 sys.excepthook = _quiet_excepthook
 
+from crawler_components.adaptive_limiter import AdaptiveLimiter
+from crawler_components.crawl_state import CrawlState
 from crawler_components.url_manager import URLManager
 from crawler_components.web_crawler import WebCrawler
 from crawler_components.pdf_generator import PDFGenerator
 from crawler_components.file_name_generator import FileNameGenerator
-from crawler_components.progress_tracker import ProgressTracker
+from crawler_components.progress_tracker import ProgressTracker, buffered_stderr
+
+logger = logging.getLogger("crawl_to_pdf")
 
 
 class CrawlToPDF:
     """Main orchestrator for crawling and PDF generation."""
     
     def __init__(self, start_url: str, output_dir: Optional[Path] = None, 
-                 workers: int = 5, delay: float = 0.5, debug: bool = False,
-                 if_exists: str = 'ask'):
+                 workers: int = 5, delay: float = 0.5,
+                 if_exists: str = 'ask', block_assets: bool = False):
         """Initialize crawler.
         
         Args:
@@ -70,15 +85,16 @@ class CrawlToPDF:
             output_dir: Output directory for PDFs (optional)
             workers: Number of parallel workers (default: 5)
             delay: Delay between requests in seconds (default: 0.5)
-            debug: Enable debug logging (default: False)
             if_exists: Behavior when output dir already exists
+            block_assets: Skip images, fonts, media and stylesheets (default: False)
         """
         self.start_url = start_url
         self.url_manager = URLManager(start_url)
         self.workers = max(1, workers)  # At least 1 worker
         self.delay = max(0.0, delay)  # Non-negative delay
-        self.debug = debug
         self._if_exists = if_exists
+        self.block_assets = block_assets
+        self._in_flight = 0  # URLs currently being processed by workers
         
         # Create output directory from domain if not provided
         if output_dir is None:
@@ -86,13 +102,12 @@ class CrawlToPDF:
             folder_name = domain.replace('.', '-') + '-pdfs'
             output_dir = Path('results') / folder_name
         
-        self.output_dir = output_dir
         self.output_dir = output_dir
         self.exists_mode = self._resolve_existing_output()
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # FileNameGenerator creates the output directory
         self.file_name_generator = FileNameGenerator(self.output_dir)
-        if self.exists_mode == 'append':
-            self.file_name_generator.register_existing_files()
+        # Frontier journal; only left on disk when a crawl is interrupted
+        self.crawl_state = CrawlState(self.output_dir / '.crawl-state.db')
         self.progress_tracker = ProgressTracker()
     
     def _resolve_existing_output(self) -> str:
@@ -142,31 +157,22 @@ class CrawlToPDF:
             print("Invalid selection. Please enter O, A, or Q.")
         
     async def _process_single_url(self, crawler: WebCrawler, pdf_generator: PDFGenerator, 
-                                   url: str, worker_id: Optional[int] = None,
-                                   active_workers: Optional[int] = None,
-                                   processed_lock: Optional[asyncio.Lock] = None) -> None:
+                                   page: Page, url: str, worker_id: Optional[int] = None,
+                                   active_workers: Optional[int] = None) -> None:
         """Process a single URL: load, extract links, generate PDF.
         
         Args:
             crawler: WebCrawler instance
             pdf_generator: PDFGenerator instance
+            page: Pooled page to load the URL in
             url: URL to process
             worker_id: Optional worker ID for logging
             active_workers: Optional number of active workers for logging
-            processed_lock: Optional lock for thread-safe processed URL tracking
         """
-        # Check if URL has already been processed (thread-safe check)
-        if processed_lock:
-            async with processed_lock:
-                if self.url_manager.is_processed(url):
-                    if self.debug:
-                        print(f"[DEBUG] Worker-{worker_id} skipping already processed URL: {url}", file=sys.stderr)
-                    return
-        else:
-            if self.url_manager.is_processed(url):
-                if self.debug:
-                    print(f"[DEBUG] Worker-{worker_id} skipping already processed URL: {url}", file=sys.stderr)
-                return
+        # Claim the URL so no other worker processes it as well
+        if not self.url_manager.try_claim(url):
+            logger.debug("Worker-%d skipping already claimed URL: %s", worker_id, url)
+            return
         
         # Start processing
         self.progress_tracker.start_processing(url, worker_id, active_workers)
@@ -177,8 +183,7 @@ class CrawlToPDF:
         self.progress_tracker.set_total(processed + queue_size)
         
         # Load page
-        page = await crawler.load_page(url)
-        if not page:
+        if not await crawler.navigate(page, url):
             self.progress_tracker.finish_processing(
                 url, 
                 success=False, 
@@ -193,42 +198,14 @@ class CrawlToPDF:
             title = await crawler.get_page_title(page)
             
             # Extract links and add to queue
-            links = await crawler.extract_links(page, url)
-            for link in links:
-                self.url_manager.add_url(link)
+            links = await crawler.extract_links(page)
+            await self.url_manager.add_urls_batch(links, url)
             
             # Update total after discovering new links
             queue_size = self.url_manager.get_queue_size()
             processed = self.url_manager.get_visited_count()
             self.progress_tracker.set_total(processed + queue_size)
             
-            # Double-check if URL has been processed by another worker while we were loading the page
-            if processed_lock:
-                async with processed_lock:
-                    if self.url_manager.is_processed(url):
-                        if self.debug:
-                            print(f"[DEBUG] Worker-{worker_id} skipping URL processed by another worker: {url}", file=sys.stderr)
-                        self.progress_tracker.finish_processing(
-                            url,
-                            success=False,
-                            error="Already processed by another worker",
-                            worker_id=worker_id,
-                            active_workers=active_workers
-                        )
-                        return
-            else:
-                if self.url_manager.is_processed(url):
-                    if self.debug:
-                        print(f"[DEBUG] Worker-{worker_id} skipping URL processed by another worker: {url}", file=sys.stderr)
-                    self.progress_tracker.finish_processing(
-                        url,
-                        success=False,
-                        error="Already processed by another worker",
-                        worker_id=worker_id,
-                        active_workers=active_workers
-                    )
-                    return
-            
             # Generate PDF
             access_timestamp = datetime.now(timezone.utc).astimezone()
             
@@ -240,31 +217,7 @@ class CrawlToPDF:
             # Mark as processed only if PDF was successfully generated (thread-safe)
             if pdf_path or status in ('skipped', 'unchanged'):
                 # Note: 'skipped' and 'unchanged' also count as processed for the URL manager
-                if processed_lock:
-                    async with processed_lock:
-                        # Double-check again before marking (another worker might have processed it)
-                        if not self.url_manager.is_processed(url):
-                            self.url_manager.mark_as_processed(url)
-                        else:
-                            if self.debug:
-                                print(f"[DEBUG] Worker-{worker_id} URL was processed by another worker, deleting duplicate PDF: {pdf_path}", file=sys.stderr)
-                            # Delete duplicate PDF if created
-                            if pdf_path and status == 'created':
-                                try:
-                                    pdf_path.unlink()
-                                except Exception:
-                                    pass
-                            self.progress_tracker.finish_processing(
-                                url,
-                                success=False,
-                                error="Already processed by another worker",
-                                worker_id=worker_id,
-                                active_workers=active_workers,
-                                status='failed'
-                            )
-                            return
-                else:
-                    self.url_manager.mark_as_processed(url)
+                self.url_manager.mark_as_processed(url)
                 
                 self.progress_tracker.finish_processing(url, success=True,
                                                        worker_id=worker_id,
@@ -292,165 +245,117 @@ class CrawlToPDF:
                 worker_id=worker_id,
                 active_workers=active_workers
             )
-        
-        finally:
-            await crawler.close_page(page)
     
-    async def _worker(self, crawler: WebCrawler, pdf_generator: PDFGenerator, 
-                      semaphore: asyncio.Semaphore, worker_id: int,
-                      active_workers_counter: dict, active_workers_lock: asyncio.Lock,
-                      processed_lock: asyncio.Lock) -> None:
+    async def _worker(self, crawler: WebCrawler, pdf_generator: PDFGenerator,
+                      worker_id: int) -> None:
         """Worker function that processes URLs from queue.
         
         Args:
             crawler: WebCrawler instance
             pdf_generator: PDFGenerator instance
-            semaphore: Semaphore to limit concurrent URL processing
             worker_id: Unique ID for this worker
-            active_workers_counter: Dictionary to track active workers count
-            active_workers_lock: Lock for thread-safe counter access
-            processed_lock: Lock for thread-safe processed URL tracking
         """
-        if self.debug:
-            print(f"[DEBUG] Worker-{worker_id} started", file=sys.stderr)
+        logger.debug("Worker-%d started", worker_id)
         processed_count = 0
-        empty_check_count = 0
-        max_empty_checks = 10  # Exit after 10 consecutive empty checks
         
         while True:
-            # STEP 1: Acquire semaphore ONLY for getting URL (quick operation)
-            if self.debug:
-                print(f"[DEBUG] Worker-{worker_id} waiting for semaphore to get URL...", file=sys.stderr)
-            url = None
+            # STEP 1: Wait for next URL (sentinel None means shutdown)
+            logger.debug("Worker-%d waiting for URL...", worker_id)
+            url = await self.url_manager.get_q()
+            if url is None:
+                logger.debug("Worker-%d received shutdown signal", worker_id)
+                break
             
-            async with semaphore:
-                if self.debug:
-                    print(f"[DEBUG] Worker-{worker_id} acquired semaphore for URL fetch", file=sys.stderr)
-                
-                # Check if there are more URLs
-                if not self.url_manager.has_more():
-                    empty_check_count += 1
-                    if self.debug:
-                        print(f"[DEBUG] Worker-{worker_id} no more URLs (check {empty_check_count}/{max_empty_checks})", file=sys.stderr)
-                    if empty_check_count >= max_empty_checks:
-                        if self.debug:
-                            print(f"[DEBUG] Worker-{worker_id} exiting after {max_empty_checks} empty checks", file=sys.stderr)
-                        break
-                    url = None
-                else:
-                    # Get next URL (inside semaphore to prevent race condition)
-                    url = self.url_manager.get_next_url()
-                    if not url:
-                        empty_check_count += 1
-                        if self.debug:
-                            print(f"[DEBUG] Worker-{worker_id} got None URL (check {empty_check_count}/{max_empty_checks})", file=sys.stderr)
-                        if empty_check_count >= max_empty_checks:
-                            if self.debug:
-                                print(f"[DEBUG] Worker-{worker_id} exiting after {max_empty_checks} empty checks", file=sys.stderr)
-                            break
-                    else:
-                        # Reset empty check counter if we got a URL
-                        empty_check_count = 0
-                        processed_count += 1
-                        if self.debug:
-                            print(f"[DEBUG] Worker-{worker_id} got URL #{processed_count}: {url}", file=sys.stderr)
+            processed_count += 1
+            self._in_flight += 1
+            active_workers = self._in_flight
+            logger.debug("Worker-%d got URL #%d: %s (active: %d)", worker_id, processed_count, url, active_workers)
             
-            # STEP 2: Process URL OUTSIDE semaphore (allows parallel processing)
-            if url:
-                # Increment active workers counter
-                async with active_workers_lock:
-                    active_workers_counter['count'] += 1
-                    active_workers = active_workers_counter['count']
-                    if self.debug:
-                        print(f"[DEBUG] Worker-{worker_id} processing URL (active: {active_workers})", file=sys.stderr)
-                
-                try:
-                    # Process the URL (semaphore is NOT held, so other workers can get URLs)
-                    await self._process_single_url(
-                        crawler, pdf_generator, url, worker_id, active_workers, processed_lock
+            # STEP 2: Process URL on a pooled page (other workers keep pulling from the queue meanwhile)
+            page = None
+            try:
+                page = await crawler.acquire_page()
+                await self._process_single_url(
+                    crawler, pdf_generator, page, url, worker_id, active_workers
+                )
+                logger.debug("Worker-%d finished processing URL", worker_id)
+            except Exception as e:
+                logger.debug("Worker-%d error: %s", worker_id, e)
+                if page is None:
+                    # Only this URL fails; the worker keeps going with the next one.
+                    # Count it first so the [N/...] index and Processed total include it
+                    self.progress_tracker.start_processing(url, worker_id, active_workers)
+                    self.progress_tracker.finish_processing(
+                        url,
+                        success=False,
+                        error=f"Failed to open page: {e}",
+                        worker_id=worker_id,
+                        active_workers=active_workers
                     )
-                    if self.debug:
-                        print(f"[DEBUG] Worker-{worker_id} finished processing URL", file=sys.stderr)
-                except (asyncio.CancelledError, KeyboardInterrupt):
-                    async with active_workers_lock:
-                        active_workers_counter['count'] -= 1
-                    raise
-                except Exception as e:
-                    if self.debug:
-                        print(f"[DEBUG] Worker-{worker_id} error: {e}", file=sys.stderr)
-                    pass
-                finally:
-                    async with active_workers_lock:
-                        active_workers_counter['count'] -= 1
-                    if self.debug:
-                        print(f"[DEBUG] Worker-{worker_id} done, counter decremented", file=sys.stderr)
-                
-                # Delay between requests (after processing)
-                if self.delay > 0:
-                    if self.debug:
-                        print(f"[DEBUG] Worker-{worker_id} delaying {self.delay}s", file=sys.stderr)
-                    await asyncio.sleep(self.delay)
-            else:
-                # Queue was empty, wait before checking again
-                wait_time = 0.2
-                if self.debug:
-                    print(f"[DEBUG] Worker-{worker_id} queue empty, waiting {wait_time}s", file=sys.stderr)
-                await asyncio.sleep(wait_time)
-        
-        if self.debug:
-            print(f"[DEBUG] Worker-{worker_id} finished (processed {processed_count} URLs)", file=sys.stderr)
+            finally:
+                self._in_flight -= 1
+                # Nothing queued and nobody left to discover links: wake everyone up to exit
+                if self._in_flight == 0 and self.url_manager.is_empty():
+                    logger.debug("Worker-%d queue drained, signalling shutdown", worker_id)
+                    self.url_manager.shutdown(self.workers)
+                # Return the page for reuse; pages closed after an unrecoverable error are dropped
+                if page is not None:
+                    await crawler.release_page(page)
+            
+            # Delay between requests (after processing)
+            if self.delay > 0:
+                logger.debug("Worker-%d delaying %ss", worker_id, self.delay)
+                await asyncio.sleep(self.delay)
+        
+        logger.debug("Worker-%d finished (processed %d URLs)", worker_id, processed_count)
     
     async def crawl(self):
         """Main crawling workflow with parallel workers."""
         browser = None
+        pdf_generator = None
         try:
+            # Resume the frontier of an interrupted crawl if one was saved
+            pending = self.url_manager.attach_state(self.crawl_state)
+            if pending:
+                print(f"Resuming interrupted crawl: {pending} URLs pending", file=buffered_stderr)
+            elif self.url_manager.is_empty():
+                # Saved crawl had nothing left to do; let workers exit right away
+                self.url_manager.shutdown(self.workers)
+            self.crawl_state.start()
+            
             async with async_playwright() as p:
                 # Launch headless Chrome
                 browser = await p.chromium.launch(headless=True)
                 
                 try:
-                    crawler = WebCrawler(browser, self.url_manager)
+                    # Page loads start below the worker count and adapt to how the site responds
+                    limiter = AdaptiveLimiter(self.workers)
+                    crawler = WebCrawler(browser, self.url_manager, block_assets=self.block_assets,
+                                         limiter=limiter)
+                    await crawler.start()
                     pdf_generator = PDFGenerator(self.file_name_generator)
+                    pdf_generator.start()
                     
-                    # Create semaphore to limit concurrent URL processing
-                    # This ensures maximum 'workers' URLs are processed simultaneously
-                    semaphore = asyncio.Semaphore(self.workers)
-                    # Counter to track active workers
-                    active_workers_counter = {'count': 0}
-                    active_workers_lock = asyncio.Lock()
-                    # Lock for thread-safe processed URL tracking
-                    processed_lock = asyncio.Lock()
+                    logger.debug("Creating %d workers", self.workers)
+                    logger.debug("Initial queue size: %s", self.url_manager.get_queue_size())
+                    logger.debug("Initial visited count: %s", self.url_manager.get_visited_count())
                     
-                    if self.debug:
-                        print(f"[DEBUG] Creating {self.workers} workers with semaphore limit {self.workers}", file=sys.stderr)
-                        print(f"[DEBUG] Initial queue size: {self.url_manager.get_queue_size()}", file=sys.stderr)
-                        print(f"[DEBUG] Initial visited count: {self.url_manager.get_visited_count()}", file=sys.stderr)
-                    
-                    # Create worker tasks - each worker processes URLs from queue
-                    worker_tasks = []
-                    for worker_id in range(1, self.workers + 1):
-                        if self.debug:
-                            print(f"[DEBUG] Creating Worker-{worker_id} task", file=sys.stderr)
-                        task = asyncio.create_task(
-                            self._worker(crawler, pdf_generator, semaphore, worker_id,
-                                       active_workers_counter, active_workers_lock, processed_lock)
-                        )
-                        worker_tasks.append(task)
+                    # Each worker processes URLs from queue; the task group waits for all of
+                    # them and cancels the rest if one fails or the crawl is interrupted
+                    async with asyncio.TaskGroup() as task_group:
+                        for worker_id in range(1, self.workers + 1):
+                            logger.debug("Creating Worker-%d task", worker_id)
+                            task_group.create_task(
+                                self._worker(crawler, pdf_generator, worker_id)
+                            )
+                        
+                        logger.debug("All %d worker tasks created", self.workers)
                     
-                    if self.debug:
-                        print(f"[DEBUG] All {len(worker_tasks)} worker tasks created", file=sys.stderr)
+                    await crawler.close_pages()
                     
-                    # Wait for all workers to complete
-                    try:
-                        await asyncio.gather(*worker_tasks, return_exceptions=True)
-                    except (asyncio.CancelledError, KeyboardInterrupt):
-                        # Cancel all workers
-                        self.all_done = True
-                        for task in worker_tasks:
-                            task.cancel()
-                        # Wait for cancellation to complete
-                        await asyncio.gather(*worker_tasks, return_exceptions=True)
-                        raise
+                    # Flush PDFs still waiting in the writer queue
+                    await pdf_generator.close()
+                    await self.crawl_state.close(complete=True)
                     
                     # Print summary
                     self.progress_tracker.print_summary()
@@ -466,6 +371,7 @@ class CrawlToPDF:
         
         except (KeyboardInterrupt, asyncio.CancelledError):
             # Handle graceful shutdown
+            self.progress_tracker.flush()
             print("\n\n" + "="*60, file=sys.stderr)
             print("Process stopped by user.", file=sys.stderr)
             print("="*60, file=sys.stderr)
@@ -475,6 +381,14 @@ class CrawlToPDF:
                 print(f"\nCompleted pages: {self.progress_tracker.get_processed_count()}", file=sys.stderr)
                 print(f"PDFs saved to: {self.output_dir}", file=sys.stderr)
             
+            # Save queued PDFs and the frontier so the next run can resume
+            try:
+                if pdf_generator:
+                    await pdf_generator.close()
+                await self.crawl_state.close(complete=False)
+            except Exception:
+                pass
+            
             # Try to close browser gracefully
             if browser:
                 try:
@@ -482,13 +396,21 @@ class CrawlToPDF:
                 except Exception:
                     pass
             
+            # os._exit skips atexit, so write out warnings buffered during close first
+            buffered_stderr.drain()
+            
             # Use os._exit to bypass Python's cleanup which causes threading exceptions
             # This prevents "Exception ignored" messages from threading module
             os._exit(0)
         
         except Exception as e:
             # Handle other unexpected errors
+            self.progress_tracker.flush()
             print(f"\n\nError occurred: {str(e)}", file=sys.stderr)
+            try:
+                await self.crawl_state.close(complete=False)
+            except Exception:
+                pass
             if browser:
                 try:
                     await browser.close()
@@ -553,6 +475,7 @@ Examples:
   python crawl_to_pdf.py example.com --output my-pdfs
   python crawl_to_pdf.py example.com --workers 10 --delay 1.0
   python crawl_to_pdf.py example.com -w 3 -d 0.3
+  python crawl_to_pdf.py example.com --block-assets
             """
         )
         
@@ -571,7 +494,7 @@ Examples:
             '--workers', '-w',
             type=int,
             default=5,
-            help='Number of parallel workers (default: 5)'
+            help='Number of parallel workers (default: 5); concurrent page loads start at half this and adapt up to it'
         )
         
         parser.add_argument(
@@ -594,6 +517,12 @@ Examples:
             help="Behavior when output directory already exists (default: ask)"
         )
         
+        parser.add_argument(
+            '--block-assets',
+            action='store_true',
+            help='Do not load images, fonts, media and stylesheets (faster, but PDFs lose them)'
+        )
+        
         args = parser.parse_args()
         
         # Validate arguments
@@ -602,14 +531,21 @@ Examples:
         if args.delay < 0:
             parser.error("Delay must be non-negative")
         
+        # Debug messages go through the logger so they cost nothing when disabled
+        # Share the buffered progress stream so debug lines stay in order with progress output
+        handler = logging.StreamHandler(buffered_stderr)
+        handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG if args.debug else logging.WARNING)
+        
         # Create crawler and run with proper exception handling
         crawler = CrawlToPDF(
             args.url,
             args.output,
             workers=args.workers,
             delay=args.delay,
-            debug=args.debug,
-            if_exists=args.if_exists
+            if_exists=args.if_exists,
+            block_assets=args.block_assets
         )
         
         # Create event loop with custom exception handler
@@ -650,11 +586,13 @@ Examples:
     
     except KeyboardInterrupt:
         # This should be caught by crawl() method, but just in case
+        buffered_stderr.drain()
         print("\n\nProcess stopped.", file=sys.stderr)
         # Suppress threading cleanup exceptions by exiting immediately
         os._exit(0)
     
     except Exception as e:
+        buffered_stderr.drain()
         print(f"\nUnexpected error: {str(e)}", file=sys.stderr)
         sys.exit(1)
 
@@ -0,0 +1,69 @@
+"""This file limits concurrent page loads with AIMD-style adaptive tuning."""
+import asyncio
+from collections import deque
+from typing import Deque, Optional
+
+
+class AdaptiveLimiter:
+    """Semaphore whose limit grows on success and halves on overload signals."""
+    
+    def __init__(self, max_limit: int, initial_limit: Optional[int] = None,
+                 increase_after: int = 10):
+        """Initialize adaptive limiter.
+        
+        Args:
+            max_limit: Upper bound for concurrent holders (number of workers)
+            initial_limit: Starting limit (default: half of max_limit)
+            increase_after: Consecutive successes needed to raise the limit by one
+        """
+        self.max_limit = max(1, max_limit)
+        if initial_limit is None:
+            initial_limit = self.max_limit // 2
+        self.current_limit = min(self.max_limit, max(1, initial_limit))
+        self.increase_after = increase_after
+        self.success_streak = 0
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+    
+    async def acquire(self) -> None:
+        """Wait until a slot is free under the current limit."""
+        if self.active < self.current_limit and not self._waiters:
+            self.active += 1
+            return
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Slot was handed over right before cancellation; give it back
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+    
+    def release(self) -> None:
+        """Free a slot and wake waiters that now fit under the limit."""
+        self.active -= 1
+        self._wake_waiters()
+    
+    def record_success(self) -> None:
+        """Additive increase: raise the limit after a streak of successes."""
+        self.success_streak += 1
+        if self.success_streak >= self.increase_after:
+            self.success_streak = 0
+            if self.current_limit < self.max_limit:
+                self.current_limit += 1
+                self._wake_waiters()
+    
+    def record_overload(self) -> None:
+        """Multiplicative decrease: halve the limit on timeouts, 429 or 5xx."""
+        self.success_streak = 0
+        self.current_limit = max(1, self.current_limit // 2)
+    
+    def _wake_waiters(self) -> None:
+        """Hand free slots to waiters in FIFO order."""
+        while self._waiters and self.active < self.current_limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
@@ -0,0 +1,152 @@
+"""This file persists the crawl frontier to SQLite so interrupted crawls can resume."""
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS frontier ('
+    'url TEXT PRIMARY KEY, claimed_at REAL, processed_at REAL)'
+)
+_INSERT_URL = 'INSERT OR IGNORE INTO frontier (url) VALUES (?)'
+_MARK_CLAIMED = 'UPDATE frontier SET claimed_at = ? WHERE url = ?'
+_MARK_PROCESSED = 'UPDATE frontier SET processed_at = ? WHERE url = ?'
+
+
+class CrawlState:
+    """Journals queued, claimed and processed URLs to a SQLite database in WAL mode."""
+    
+    def __init__(self, db_path: Path, batch_size: int = 100):
+        """Initialize crawl state.
+        
+        Args:
+            db_path: Path of the SQLite database file
+            batch_size: Maximum number of operations per commit
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # Pending (sql, params) operations; None stops the writer task
+        self._ops: "asyncio.Queue[Optional[Tuple[str, tuple]]]" = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task] = None
+    
+    def load(self) -> List[Tuple[str, bool]]:
+        """Open the database and read the frontier left by an interrupted crawl.
+        
+        Returns:
+            List of (URL, processed) pairs in queue order, empty for a fresh crawl
+        """
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        rows = self._conn.execute(
+            'SELECT url, processed_at IS NOT NULL FROM frontier ORDER BY rowid'
+        ).fetchall()
+        return [(url, bool(processed)) for url, processed in rows]
+    
+    def start(self) -> None:
+        """Start the background task that commits operations in batches."""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer_loop())
+    
+    def record_enqueued(self, url: str) -> None:
+        """Record a URL added to the queue.
+        
+        Args:
+            url: Normalized URL
+        """
+        self._ops.put_nowait((_INSERT_URL, (url,)))
+    
+    def record_claimed(self, url: str) -> None:
+        """Record a URL picked up by a worker.
+        
+        Args:
+            url: Normalized URL
+        """
+        self._ops.put_nowait((_MARK_CLAIMED, (time.time(), url)))
+    
+    def record_processed(self, url: str) -> None:
+        """Record a URL whose PDF was generated (or skipped).
+        
+        Args:
+            url: Normalized URL
+        """
+        self._ops.put_nowait((_MARK_PROCESSED, (time.time(), url)))
+    
+    async def close(self, complete: bool) -> None:
+        """Flush pending operations and close the database.
+        
+        Args:
+            complete: True if the crawl finished, which deletes the state files
+        """
+        if self._writer_task is not None:
+            self._ops.put_nowait(None)
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                # Writer was cancelled on interrupt; remaining ops are written below
+                pass
+            self._writer_task = None
+        
+        remaining = []
+        while not self._ops.empty():
+            op = self._ops.get_nowait()
+            if op is not None:
+                remaining.append(op)
+        self._write_ops(remaining)
+        
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+            self._conn = None
+        
+        if complete:
+            for suffix in ('', '-wal', '-shm'):
+                Path(str(self.db_path) + suffix).unlink(missing_ok=True)
+    
+    async def _writer_loop(self) -> None:
+        """Commit queued operations, up to batch_size per transaction."""
+        stopping = False
+        while not stopping:
+            op = await self._ops.get()
+            if op is None:
+                break
+            batch = [op]
+            while len(batch) < self.batch_size:
+                try:
+                    op = self._ops.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if op is None:
+                    stopping = True
+                    break
+                batch.append(op)
+            try:
+                await asyncio.to_thread(self._write_ops, batch)
+            except asyncio.CancelledError:
+                # Don't lose operations already taken off the queue. The thread may
+                # still commit them too, but every operation is idempotent
+                self._write_ops(batch)
+                raise
+    
+    def _write_ops(self, ops: List[Tuple[str, tuple]]) -> None:
+        """Execute operations in order and commit them as one transaction.
+        
+        Args:
+            ops: List of (sql, params) operations
+        """
+        if not ops or self._conn is None:
+            return
+        with self._db_lock:
+            # Group consecutive operations of the same kind into one executemany call
+            start = 0
+            for end in range(1, len(ops) + 1):
+                if end == len(ops) or ops[end][0] != ops[start][0]:
+                    self._conn.executemany(ops[start][0], [params for _, params in ops[start:end]])
+                    start = end
+            self._conn.commit()
@@ -3,9 +3,46 @@ import re
 import os
 from pathlib import Path
 from urllib.parse import urlparse
-from typing import Set, Optional
+from typing import Callable, Dict, Set, Optional
 from unidecode import unidecode
 
+_NON_WORD = re.compile(r'[^\w\-_]')
+# Maps space to underscore and drops every other ASCII character outside [\w-]
+_TITLE_TABLE = str.maketrans({
+    c: '_' if c == ' ' else None
+    for c in map(chr, range(128))
+    if not (c.isalnum() or c in '-_')
+})
+_MULTI_UNDER = re.compile(r'_+')
+_MULTI_UNDER_BYTES = re.compile(rb'_+')
+_NON_WORD_LOWER = re.compile(r'[^\w\-]')
+# Byte-level equivalents for pure ASCII input: ASCII bytes outside [\w -] are deleted,
+# titles map space to underscore and URL segments map A-Z to a-z
+_TITLE_DELETE = bytes(c for c in range(128) if not (chr(c).isalnum() or chr(c) in '-_ '))
+_TITLE_BYTES = bytes.maketrans(b' ', b'_')
+_URLSEG_DELETE = bytes(c for c in range(128) if not (chr(c).isalnum() or chr(c) in '-_'))
+_URLSEG_BYTES = bytes.maketrans(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ', b'abcdefghijklmnopqrstuvwxyz')
+
+
+def _fast_clean_ascii(s: str, maxlen: int, table: bytes, delete: bytes,
+                      squeeze: bool = False) -> str:
+    """Clean an ASCII string with a single bytes.translate pass.
+    
+    Args:
+        s: String to clean, must satisfy s.isascii()
+        maxlen: Maximum length of the result
+        table: 256-byte translation table
+        delete: Bytes to remove
+        squeeze: Collapse runs of underscores before truncating
+        
+    Returns:
+        Cleaned string
+    """
+    data = s.encode('ascii').translate(table, delete)
+    if squeeze:
+        data = _MULTI_UNDER_BYTES.sub(b'_', data)
+    return data[:maxlen].decode('ascii')
+
 
 class FileNameGenerator:
     """Generates safe PDF file names from page titles and URLs."""
@@ -17,13 +54,16 @@ class FileNameGenerator:
             output_dir: Directory where PDFs will be saved
         """
         self.output_dir = output_dir
-        self.used_names: Set[str] = set()
+        self._counters: Dict[str, int] = {}  # Next duplicate counter to try per base name
         self.output_dir.mkdir(parents=True, exist_ok=True)
-    
-    def register_existing_files(self):
-        """Seed used names with existing PDF files in output directory."""
-        for existing_pdf in self.output_dir.glob('*.pdf'):
-            self.used_names.add(existing_pdf.stem)
+        # String prefix so building a PDF path doesn't go through PurePath joining
+        self._prefix = str(output_dir) + os.sep
+        # Seed used names from PDFs already on disk (one directory scan) so resumed
+        # or appended crawls never overwrite an existing file
+        with os.scandir(self.output_dir) as entries:
+            self.used_names: Set[str] = {
+                entry.name[:-4] for entry in entries if entry.name.endswith('.pdf')
+            }
         
     def _clean_title(self, title: str) -> str:
         """Clean and normalize title for file name.
@@ -40,22 +80,19 @@ class FileNameGenerator:
         # Remove extra whitespace
         title = title.strip()
         
-        # Replace spaces with underscores
-        title = title.replace(' ', '_')
-        
-        # Remove or replace special characters that are problematic in filenames
-        # Keep Turkish characters but convert to ASCII-friendly versions
-        title = unidecode(title)
+        # ASCII titles need no transliteration and are cleaned at the byte level
+        if title.isascii():
+            return _fast_clean_ascii(title, 50, _TITLE_BYTES, _TITLE_DELETE, squeeze=True).strip('_')
         
-        # Remove remaining special characters
-        title = re.sub(r'[^\w\-_]', '', title)
+        # Replace spaces with underscores and remove ASCII special characters in one pass
+        title = title.translate(_TITLE_TABLE)
         
-        # Remove multiple consecutive underscores
-        title = re.sub(r'_+', '_', title)
+        # Keep Turkish characters but convert to ASCII-friendly versions,
+        # then remove special characters produced by the transliteration
+        title = _NON_WORD.sub('', unidecode(title))
         
-        # Limit length
-        if len(title) > 50:
-            title = title[:50]
+        # Remove multiple consecutive underscores and limit length
+        title = _MULTI_UNDER.sub('_', title)[:50]
         
         return title.strip('_')
     
@@ -93,17 +130,18 @@ class FileNameGenerator:
         Returns:
             Cleaned segment
         """
+        # Lowercase and remove special characters in one pass for ASCII segments
+        if segment.isascii():
+            return _fast_clean_ascii(segment, 30, _URLSEG_BYTES, _URLSEG_DELETE)
+        
         # Convert to lowercase
         segment = segment.lower()
         
         # Remove special characters
-        segment = re.sub(r'[^\w\-]', '', segment)
+        segment = _NON_WORD_LOWER.sub('', segment)
         
         # Limit length
-        if len(segment) > 30:
-            segment = segment[:30]
-        
-        return segment
+        return segment[:30]
     
     def generate_name(self, title: str, url: str) -> str:
         """Generate PDF file name from title and URL.
@@ -115,25 +153,26 @@ class FileNameGenerator:
         Returns:
             PDF file name (without .pdf extension)
         """
-        clean_title = self._clean_title(title)
-        url_segment = self._get_url_segment(url)
-        clean_segment = self._clean_url_segment(url_segment)
-        
-        # Combine: title_segment
-        if clean_segment and clean_segment != 'index':
-            file_name = f"{clean_title}_{clean_segment}"
-        else:
-            file_name = clean_title
+        return self.reserve_name(self.get_base_name(title, url))
+    
+    def reserve_name(self, base_name: str) -> str:
+        """Reserve a unique file name derived from a base name.
         
-        # Handle duplicates
-        base_name = file_name
-        counter = 1
-        final_name = file_name
+        Args:
+            base_name: Base PDF file name from get_base_name
+            
+        Returns:
+            base_name, or base_name with a numeric suffix if it is already used
+        """
+        # Handle duplicates, resuming from the last counter used for this base name
+        counter = self._counters.get(base_name, 0)
+        final_name = base_name if counter == 0 else f"{base_name}_{counter}"
         
         while final_name in self.used_names:
-            final_name = f"{base_name}_{counter}"
             counter += 1
+            final_name = f"{base_name}_{counter}"
         
+        self._counters[base_name] = counter + 1
         self.used_names.add(final_name)
         return final_name
     
@@ -168,7 +207,7 @@ class FileNameGenerator:
         Returns:
             Full path to PDF file
         """
-        return self.output_dir / f"{file_name}.pdf"
+        return Path(self._prefix + file_name + '.pdf')
 
     def get_hash_path(self, pdf_path: Path) -> Path:
         """Get path for the hash file corresponding to a PDF.
@@ -186,6 +225,14 @@ class FileNameGenerator:
         # Return the full path to the hash file
         return hash_dir / pdf_path.with_suffix('.hash').name
 
+    def get_manifest_path(self) -> Path:
+        """Get path of the manifest recording content hashes of generated PDFs.
+        
+        Returns:
+            Path to manifest.jsonl in the .hashes subdirectory
+        """
+        return self.output_dir / '.hashes' / 'manifest.jsonl'
+    
     def get_latest_version(self, title: str, url: str) -> Optional[Path]:
         """Find the latest version of a PDF for the given title and URL.
         
@@ -196,10 +243,27 @@ class FileNameGenerator:
         Returns:
             Path to the latest version (e.g., file_5.pdf) or None if no file exists.
         """
-        base_name = self.get_base_name(title, url)
+        return self.get_latest_version_of(self.get_base_name(title, url))
+    
+    def get_latest_version_of(
+        self,
+        base_name: str,
+        exists: Optional[Callable[[Path], bool]] = None
+    ) -> Optional[Path]:
+        """Find the latest version of a PDF for the given base name.
+        
+        Args:
+            base_name: Base PDF file name from get_base_name
+            exists: Predicate telling whether a PDF path exists (defaults to Path.exists)
+            
+        Returns:
+            Path to the latest version (e.g., file_5.pdf) or None if no file exists.
+        """
+        if exists is None:
+            exists = Path.exists
         base_path = self.get_full_path(base_name)
         
-        if not base_path.exists():
+        if not exists(base_path):
             return None
             
         # Check for numbered versions
@@ -209,7 +273,7 @@ class FileNameGenerator:
         while True:
             next_name = f"{base_name}_{counter}"
             next_path = self.get_full_path(next_name)
-            if next_path.exists():
+            if exists(next_path):
                 latest_path = next_path
                 counter += 1
             else:
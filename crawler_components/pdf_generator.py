@@ -1,10 +1,92 @@
 """This file converts pages to PDF output using Playwright."""
 import asyncio
+import hashlib
+import html
+import json
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, IO, List, Optional, Tuple
 from playwright.async_api import Page
 from .file_name_generator import FileNameGenerator
+from .progress_tracker import buffered_stderr
+
+try:
+    import xxhash
+except ImportError:  # Optional speedup, fall back to hashlib
+    xxhash = None
+
+# Characters of page HTML encoded per hash update
+_HASH_CHUNK_CHARS = 1 << 20
+
+# Playwright header template format
+# Header template must be valid HTML with inline styles
+# Width should be specified, and content should fit within header area
+_HEADER_TEMPLATE = (
+    '<div style="'
+    'font-size: 9px; '
+    'color: #444444; '
+    'padding: 5px 15px; '
+    'width: 100%; '
+    'text-align: left; '
+    'font-family: Arial, sans-serif; '
+    'box-sizing: border-box; '
+    'overflow: hidden; '
+    'white-space: nowrap; '
+    'text-overflow: ellipsis;'
+    '">'
+    '<div style="margin-bottom:2px;"><span>{url}</span></div>'
+    '<div><span>Access Date: {ts} by Crawl to PDF</span></div>'
+    '</div>'
+)
+
+
+def _content_hash(content: str, algorithm: Optional[str] = None) -> Optional[str]:
+    """Hash page content for change detection.
+    
+    The content is encoded and fed to the hash in chunks, so no full UTF-8
+    copy of a large page is ever held in memory.
+    
+    Args:
+        content: Page HTML
+        algorithm: 'xxh3_128', 'blake2b' or 'sha256'; defaults to the fastest available
+        
+    Returns:
+        Digest prefixed with its algorithm (bare hex for sha256, as written by
+        older versions), or None if the algorithm is unavailable
+    """
+    if algorithm is None:
+        algorithm = 'xxh3_128' if xxhash is not None else 'blake2b'
+    if algorithm == 'xxh3_128':
+        if xxhash is None:
+            return None
+        hasher, prefix = xxhash.xxh3_128(), 'xxh3_128:'
+    elif algorithm == 'blake2b':
+        hasher, prefix = hashlib.blake2b(digest_size=16), 'blake2b:'
+    elif algorithm == 'sha256':
+        hasher, prefix = hashlib.sha256(), ''
+    else:
+        return None
+    for start in range(0, len(content), _HASH_CHUNK_CHARS):
+        hasher.update(content[start:start + _HASH_CHUNK_CHARS].encode('utf-8'))
+    return prefix + hasher.hexdigest()
+
+
+def _hash_matches(stored_hash: str, content: str, content_hash: str) -> bool:
+    """Check whether a stored hash was computed from the same content.
+    
+    Args:
+        stored_hash: Hash read from a .hash file
+        content: Page HTML
+        content_hash: Hash of content with the default algorithm
+        
+    Returns:
+        True if the content is unchanged
+    """
+    if stored_hash == content_hash:
+        return True
+    # Rehash with the algorithm the stored hash was written with
+    algorithm = stored_hash.partition(':')[0] if ':' in stored_hash else 'sha256'
+    return _content_hash(content, algorithm) == stored_hash
 
 
 class PDFGenerator:
@@ -17,7 +99,219 @@ class PDFGenerator:
             file_name_generator: File name generator instance
         """
         self.file_name_generator = file_name_generator
+        # (PDF path, PDF bytes, content hash) waiting to be flushed to disk by the
+        # writer task; None stops it
+        self._write_q: "asyncio.Queue[Optional[Tuple[Path, bytes, str]]]" = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task] = None
+        self.max_batch = 16
+        self.max_wait_ms = 50
+        # Queued writes per PDF path not yet on disk; such PDFs count as existing
+        self._pending: Dict[Path, int] = {}
+        # Content hash per PDF file name, from the manifest of earlier runs plus this one
+        self._manifest_path = file_name_generator.get_manifest_path()
+        self._manifest: Optional[IO[str]] = None
+        self._hashes: Dict[str, str] = self._load_manifest()
+        # Local zone part of the access date, formatted once; recomputed only for
+        # timestamps in another zone or after a DST change
+        now = datetime.now(timezone.utc).astimezone()
+        self._tz_key = (now.utcoffset(), now.tzname())
+        self._tz_suffix = now.strftime(" %Z%z")
+    
+    def start(self) -> None:
+        """Start the background task that writes generated PDFs to disk."""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer_loop())
+    
+    async def close(self) -> None:
+        """Flush pending PDF writes and stop the writer task."""
+        if self._writer_task is None:
+            return
+        self._write_q.put_nowait(None)
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            # Writer was cancelled on interrupt; PDFs still queued are written below
+            pass
+        self._writer_task = None
+        
+        remaining = []
+        while not self._write_q.empty():
+            item = self._write_q.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        self._write_batch_now(remaining)
+        
+        if self._manifest is not None:
+            self._manifest.close()
+            self._manifest = None
+    
+    async def _writer_loop(self) -> None:
+        """Collect queued PDFs into batches and write each batch concurrently."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._write_q.get()
+            if item is None:
+                break
+            batch = [item]
+            try:
+                deadline = loop.time() + self.max_wait_ms / 1000
+                while len(batch) < self.max_batch:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._write_q.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                await self._write_batch(batch)
+            except asyncio.CancelledError:
+                # Don't lose PDFs already taken off the queue
+                self._write_batch_now(batch)
+                raise
+    
+    async def _write_batch(self, batch: List[Tuple[Path, bytes, str]]) -> None:
+        """Write a batch of PDFs to disk in worker threads.
+        
+        Args:
+            batch: List of (PDF path, PDF bytes, content hash) tuples
+        """
+        latest = self._latest_per_path(batch)
+        results = await asyncio.gather(
+            *[asyncio.to_thread(path.write_bytes, data) for path, data, _ in latest],
+            return_exceptions=True
+        )
+        self._mark_written(batch)
+        written = []
+        for (path, _, content_hash), result in zip(latest, results):
+            if isinstance(result, Exception):
+                print(f"Warning: Failed to write PDF file {path}: {result}", file=buffered_stderr)
+            else:
+                written.append((path, content_hash))
+        await asyncio.to_thread(self._append_manifest, written)
+    
+    def _write_batch_now(self, batch: List[Tuple[Path, bytes, str]]) -> None:
+        """Write a batch of PDFs to disk on the calling thread.
+        
+        Args:
+            batch: List of (PDF path, PDF bytes, content hash) tuples
+        """
+        written = []
+        for path, data, content_hash in self._latest_per_path(batch):
+            try:
+                path.write_bytes(data)
+                written.append((path, content_hash))
+            except Exception as e:
+                print(f"Warning: Failed to write PDF file {path}: {e}", file=buffered_stderr)
+        self._mark_written(batch)
+        self._append_manifest(written)
+    
+    def _latest_per_path(self, batch: List[Tuple[Path, bytes, str]]) -> List[Tuple[Path, bytes, str]]:
+        """Keep only the last queued PDF for each path.
+        
+        Writes in a batch run concurrently, so an earlier PDF for the same path
+        could otherwise land on disk after the later one.
+        
+        Args:
+            batch: List of (PDF path, PDF bytes, content hash) tuples in queue order
+            
+        Returns:
+            Batch with one tuple per path
+        """
+        latest: Dict[Path, Tuple[Path, bytes, str]] = {}
+        for item in batch:
+            latest[item[0]] = item
+        return list(latest.values())
+    
+    def _mark_written(self, batch: List[Tuple[Path, bytes, str]]) -> None:
+        """Stop counting a batch's PDFs as pending once their writes finished.
+        
+        Args:
+            batch: List of (PDF path, PDF bytes, content hash) tuples as queued
+        """
+        for path, _, _ in batch:
+            count = self._pending.get(path, 0) - 1
+            if count > 0:
+                self._pending[path] = count
+            else:
+                self._pending.pop(path, None)
+    
+    def _load_manifest(self) -> Dict[str, str]:
+        """Read content hashes recorded by earlier runs.
+        
+        Returns:
+            Dictionary mapping PDF file name to content hash
+        """
+        hashes: Dict[str, str] = {}
+        try:
+            with open(self._manifest_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        hashes[entry['file']] = entry['hash']
+                    except (ValueError, KeyError, TypeError):
+                        # Skip a line cut short by an interrupted run
+                        continue
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Failed to read hash manifest: {e}", file=buffered_stderr)
+        return hashes
+    
+    def _append_manifest(self, written: List[Tuple[Path, str]]) -> None:
+        """Record the content hashes of PDFs written to disk, one JSON line each.
+        
+        Args:
+            written: List of (PDF path, content hash) pairs
+        """
+        if not written:
+            return
+        try:
+            if self._manifest is None:
+                self._manifest_path.parent.mkdir(parents=True, exist_ok=True)
+                self._manifest = open(self._manifest_path, 'a', encoding='utf-8')
+            self._manifest.write(''.join(
+                json.dumps({'file': path.name, 'hash': content_hash}) + '\n'
+                for path, content_hash in written
+            ))
+            self._manifest.flush()
+        except OSError as e:
+            print(f"Warning: Failed to write hash manifest: {e}", file=buffered_stderr)
+    
+    def _pdf_exists(self, pdf_path: Path) -> bool:
+        """Check whether a PDF is on disk or queued to be written.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            True if the PDF exists or will be written by the writer task
+        """
+        return pdf_path in self._pending or pdf_path.exists()
+    
+    def _stored_hash(self, pdf_path: Path) -> Optional[str]:
+        """Get the content hash recorded for an existing PDF.
         
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            Content hash, or None if none was recorded
+        """
+        content_hash = self._hashes.get(pdf_path.name)
+        if content_hash is not None:
+            return content_hash
+        # Fall back to the per-PDF hash files written by older versions
+        hash_path = self.file_name_generator.get_hash_path(pdf_path)
+        try:
+            return hash_path.read_text().strip()
+        except OSError:
+            return None
+    
     def _create_header_template(self, url: str, accessed_display: str) -> str:
         """Create header template with URL information.
         
@@ -29,35 +323,9 @@ class PDFGenerator:
             HTML template string for PDF header
         """
         # Escape HTML characters in URL
-        escaped_url = (
-            url.replace('&', '&amp;')
-               .replace('<', '&lt;')
-               .replace('>', '&gt;')
-               .replace('"', '&quot;')
-               .replace("'", '&#x27;')
-        )
+        escaped_url = html.escape(url)
         
-        # Playwright header template format
-        # Header template must be valid HTML with inline styles
-        # Width should be specified, and content should fit within header area
-        template = (
-            '<div style="'
-            'font-size: 9px; '
-            'color: #444444; '
-            'padding: 5px 15px; '
-            'width: 100%; '
-            'text-align: left; '
-            'font-family: Arial, sans-serif; '
-            'box-sizing: border-box; '
-            'overflow: hidden; '
-            'white-space: nowrap; '
-            'text-overflow: ellipsis;'
-            '">'
-            f'<div style="margin-bottom:2px;"><span>{escaped_url}</span></div>'
-            f'<div><span>Access Date: {accessed_display} by Crawl to PDF</span></div>'
-            '</div>'
-        )
-        return template
+        return _HEADER_TEMPLATE.format_map({'url': escaped_url, 'ts': accessed_display})
     
     async def generate_pdf(
         self,
@@ -82,72 +350,64 @@ class PDFGenerator:
         """
         try:
             timestamp = accessed_at or datetime.now(timezone.utc).astimezone()
-            accessed_display = timestamp.strftime("%Y-%m-%d %H:%M:%S %Z%z")
+            if (timestamp.utcoffset(), timestamp.tzname()) == self._tz_key:
+                accessed_display = timestamp.strftime("%Y-%m-%d %H:%M:%S") + self._tz_suffix
+            else:
+                accessed_display = timestamp.strftime("%Y-%m-%d %H:%M:%S %Z%z")
             
             # Calculate content hash early for all modes
-            import hashlib
             content = await page.content()
-            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            content_hash = _content_hash(content)
             
-            # Initialize pdf_path as None
-            pdf_path = None
+            # Title and URL cleaning is done once; every mode derives its path from this
+            names = self.file_name_generator
+            base_name = names.get_base_name(title, url)
             
             # Handle 'skip' mode
             if exists_mode == 'skip':
-                file_name = self.file_name_generator.get_base_name(title, url)
-                pdf_path = self.file_name_generator.get_full_path(file_name)
-                if pdf_path.exists():
+                pdf_path = names.get_full_path(base_name)
+                if self._pdf_exists(pdf_path):
                     return None, 'skipped', "Skipped (already exists)"
             
             # Handle 'update' mode
             elif exists_mode == 'update':
-                file_name = self.file_name_generator.get_base_name(title, url)
-                pdf_path = self.file_name_generator.get_full_path(file_name)
-                if pdf_path.exists():
-                    hash_path = self.file_name_generator.get_hash_path(pdf_path)
-                    if hash_path.exists():
-                        try:
-                            old_hash = hash_path.read_text().strip()
-                            if old_hash == content_hash:
-                                return None, 'unchanged', "Skipped (content unchanged)"
-                        except Exception:
-                            # If hash file is corrupt or unreadable, proceed with update
-                            pass
+                pdf_path = names.get_full_path(base_name)
+                if self._pdf_exists(pdf_path):
+                    old_hash = self._stored_hash(pdf_path)
+                    if old_hash and _hash_matches(old_hash, content, content_hash):
+                        return None, 'unchanged', "Skipped (content unchanged)"
             
             # Handle 'append' mode (Smart Append)
             elif exists_mode == 'append':
-                latest_version = self.file_name_generator.get_latest_version(title, url)
+                # PDFs still queued for the writer count as versions too
+                latest_version = names.get_latest_version_of(base_name, self._pdf_exists)
                 if latest_version:
-                    latest_hash_path = self.file_name_generator.get_hash_path(latest_version)
-                    if latest_hash_path.exists():
-                        try:
-                            latest_hash = latest_hash_path.read_text().strip()
-                            if latest_hash == content_hash:
-                                return None, 'unchanged', "Skipped (content unchanged from latest version)"
-                        except Exception:
-                            pass
+                    latest_hash = self._stored_hash(latest_version)
+                    if latest_hash and _hash_matches(latest_hash, content, content_hash):
+                        return None, 'unchanged', "Skipped (content unchanged from latest version)"
                 
                 # If we are here, it means content is new or no previous version exists
                 # Generate a new unique name (standard append behavior)
-                file_name = self.file_name_generator.generate_name(title, url)
-                pdf_path = self.file_name_generator.get_full_path(file_name)
-            
-            # If pdf_path is still None (e.g., update mode but file doesn't exist yet, or overwrite/fresh mode),
-            # set it using the appropriate method based on mode
-            if not pdf_path:
-                if exists_mode in ('skip', 'update', 'overwrite', 'fresh'):
-                    file_name = self.file_name_generator.get_base_name(title, url)
-                    pdf_path = self.file_name_generator.get_full_path(file_name)
-                else:
-                    # Default fallback (should not reach here normally)
-                    return None, 'failed', f"Internal Error: PDF path not set for mode '{exists_mode}'"
+                pdf_path = names.get_full_path(names.reserve_name(base_name))
+            
+            elif exists_mode in ('overwrite', 'fresh'):
+                pdf_path = names.get_full_path(base_name)
+            
+            else:
+                # Default fallback (should not reach here normally)
+                return None, 'failed', f"Internal Error: PDF path not set for mode '{exists_mode}'"
 
-            hash_path = self.file_name_generator.get_hash_path(pdf_path)
+            # The HTML is only needed for the hash checks above; release it before
+            # the browser sends back the PDF so both are never held at once
+            del content
+            
+            existed = self._pdf_exists(pdf_path)
             
             header_template = self._create_header_template(url, accessed_display)
             
-            await page.pdf(
-                path=str(pdf_path),
+            # Render in the browser only; the writer task flushes the bytes to disk
+            # and records the hash in the manifest once the PDF is written
+            pdf_data = await page.pdf(
                 format='A4',
                 print_background=True,
                 display_header_footer=True,
@@ -159,16 +419,11 @@ class PDFGenerator:
                     'left': '1cm'
                 }
             )
+            self._hashes[pdf_path.name] = content_hash
+            self._pending[pdf_path] = self._pending.get(pdf_path, 0) + 1
+            self._write_q.put_nowait((pdf_path, pdf_data, content_hash))
             
-            # Write new hash
-            try:
-                # Ensure the directory for the hash file exists
-                hash_path.parent.mkdir(parents=True, exist_ok=True)
-                hash_path.write_text(content_hash)
-            except Exception as e:
-                print(f"Warning: Failed to write hash file: {e}", file=sys.stderr)
-            
-            status = 'updated' if (exists_mode == 'update' and pdf_path.exists()) else 'created'
+            status = 'updated' if (exists_mode == 'update' and existed) else 'created'
             
             return pdf_path, status, None
         
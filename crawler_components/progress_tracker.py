@@ -1,6 +1,101 @@
 """This file reports progress and errors of the crawler process."""
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
+import atexit
+import queue
 import sys
+import threading
+
+# Flush pending output to stderr once this many characters are buffered
+_WRITE_BATCH_CHARS = 64 * 1024
+
+
+class BufferedStderr:
+    """File-like stream that writes to stderr from a background thread in batches.
+    
+    Callers never block on the stderr lock or pay a write syscall per line. All
+    crawler output goes through the shared buffered_stderr instance so it stays
+    in the order it was written.
+    """
+    
+    def __init__(self):
+        """Initialize the stream; the writer thread starts on first write."""
+        self._out: "queue.SimpleQueue[Union[str, threading.Event]]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+    
+    def write(self, text: str) -> int:
+        """Queue text for writing to stderr.
+        
+        Args:
+            text: Text to write
+            
+        Returns:
+            Number of characters queued
+        """
+        if self._writer is None:
+            self._start()
+        self._out.put(text)
+        return len(text)
+    
+    def flush(self):
+        """Do nothing; queued output is written by the background thread.
+        
+        print(flush=True) and logging handlers call this after every write, so it
+        must not wait. Use drain() to wait for the output to reach stderr.
+        """
+    
+    def drain(self, timeout: Optional[float] = 5.0):
+        """Wait until all queued output has been written to stderr.
+        
+        Args:
+            timeout: Maximum number of seconds to wait
+        """
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._out.put(done)
+        done.wait(timeout)
+    
+    def _start(self):
+        """Start the writer thread and flush remaining output at interpreter exit."""
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='stderr-writer',
+                                                daemon=True)
+                self._writer.start()
+                atexit.register(self.drain)
+    
+    def _write_loop(self):
+        """Write queued text to stderr in batches (runs in a thread)."""
+        while True:
+            item = self._out.get()
+            batch: List[str] = []
+            size = 0
+            waiters: List[threading.Event] = []
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                    size += len(item)
+                if size >= _WRITE_BATCH_CHARS:
+                    break
+                try:
+                    item = self._out.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    sys.stderr.write(''.join(batch))
+                    sys.stderr.flush()
+                except Exception:
+                    # Output is best effort; never kill the writer thread
+                    pass
+            for waiter in waiters:
+                waiter.set()
+
+
+buffered_stderr = BufferedStderr()
 
 
 class ProgressTracker:
@@ -14,6 +109,12 @@ class ProgressTracker:
         self.updated_count = 0
         self.skipped_count = 0
         self.errors: List[str] = []
+        # Closing part of the progress prefix, rebuilt only when the total changes
+        self._progress_suffix = "/?]"
+        # Worker info template per worker ID, filled with the active worker count
+        self._worker_templates: Dict[int, str] = {}
+        # Progress lines are written to stderr by a background thread in batches
+        self._out = buffered_stderr
         
     def set_total(self, total: int):
         """Set total number of pages to process.
@@ -22,6 +123,7 @@ class ProgressTracker:
             total: Total number of pages
         """
         self.total_count = total
+        self._progress_suffix = f"/{total}]" if total else "/?]"
     
     def start_processing(self, url: str, worker_id: Optional[int] = None, 
                         active_workers: Optional[int] = None):
@@ -35,15 +137,9 @@ class ProgressTracker:
         self.processed_count += 1
         progress_str = self._format_progress()
         
-        # Add worker info if provided
-        worker_info = ""
-        if worker_id is not None:
-            worker_info = f"[Worker-{worker_id}] "
-        if active_workers is not None:
-            worker_info += f"(Active: {active_workers}) "
+        worker_info = self._format_worker_info(worker_id, active_workers)
         
-        print(f"{progress_str} {worker_info}Processing: {url}", end='\r', file=sys.stderr)
-        sys.stderr.flush()
+        self._out.write(f"{progress_str} {worker_info}Processing: {url}\r")
     
     def finish_processing(self, url: str, success: bool = True, error: Optional[str] = None,
                          worker_id: Optional[int] = None, active_workers: Optional[int] = None,
@@ -60,12 +156,7 @@ class ProgressTracker:
         """
         progress_str = self._format_progress()
         
-        # Add worker info if provided
-        worker_info = ""
-        if worker_id is not None:
-            worker_info = f"[Worker-{worker_id}] "
-        if active_workers is not None:
-            worker_info += f"(Active: {active_workers}) "
+        worker_info = self._format_worker_info(worker_id, active_workers)
         
         if success:
             if status == 'created':
@@ -80,14 +171,13 @@ class ProgressTracker:
             else:
                 action = "Completed"
                 
-            print(f"{progress_str} {worker_info}{action}: {url}", file=sys.stderr)
+            self._out.write(f"{progress_str} {worker_info}{action}: {url}\n")
         else:
             error_msg = f"{progress_str} {worker_info}Failed: {url}"
             if error:
                 error_msg += f" - {error}"
-            print(error_msg, file=sys.stderr)
+            self._out.write(error_msg + "\n")
             self.errors.append(error_msg)
-        sys.stderr.flush()
     
     def _format_progress(self) -> str:
         """Format progress string.
@@ -95,9 +185,29 @@ class ProgressTracker:
         Returns:
             Formatted progress string like "[5/20]"
         """
-        if self.total_count == 0:
-            return f"[{self.processed_count}/?]"
-        return f"[{self.processed_count}/{self.total_count}]"
+        return f"[{self.processed_count}{self._progress_suffix}"
+    
+    def _format_worker_info(self, worker_id: Optional[int], active_workers: Optional[int]) -> str:
+        """Format worker info shown before the URL.
+        
+        Args:
+            worker_id: Optional worker ID for parallel processing
+            active_workers: Optional number of active workers
+            
+        Returns:
+            Worker info like "[Worker-2] (Active: 5) ", or "" if neither is given
+        """
+        if worker_id is None or active_workers is None:
+            worker_info = "" if worker_id is None else f"[Worker-{worker_id}] "
+            if active_workers is not None:
+                worker_info += f"(Active: {active_workers}) "
+            return worker_info
+        # Common case: both given, so only the active count is formatted per call
+        template = self._worker_templates.get(worker_id)
+        if template is None:
+            template = f"[Worker-{worker_id}] (Active: {{}}) "
+            self._worker_templates[worker_id] = template
+        return template.format(active_workers)
     
     def log_error(self, url: str, error: str):
         """Log an error.
@@ -108,10 +218,19 @@ class ProgressTracker:
         """
         error_msg = f"Error processing {url}: {error}"
         self.errors.append(error_msg)
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        self._out.write(f"ERROR: {error_msg}\n")
+    
+    def flush(self, timeout: Optional[float] = 5.0):
+        """Wait until all queued output has been written to stderr.
+        
+        Args:
+            timeout: Maximum number of seconds to wait
+        """
+        self._out.drain(timeout)
     
     def print_summary(self):
         """Print final summary of crawling process."""
+        self.flush()
         print(f"\n{'='*60}", file=sys.stderr)
         print(f"Summary:", file=sys.stderr)
         print(f"  Processed: {self.processed_count} pages", file=sys.stderr)
@@ -1,7 +1,35 @@
 """This file manages URL queue and implements domain filtering."""
+import asyncio
+import functools
+import hashlib
 from urllib.parse import urlparse, urljoin, urlunparse
-from collections import deque
-from typing import Set, Deque, Optional
+from typing import Dict, List, Optional, Tuple
+from .crawl_state import CrawlState
+
+try:
+    import xxhash
+except ImportError:  # Optional speedup, fall back to hashlib
+    xxhash = None
+
+# Per-URL state flags, combined in URLManager._flags
+_QUEUED = 1
+_CLAIMED = 2
+_PROCESSED = 4
+
+
+def _fingerprint(url: str) -> bytes:
+    """Get a 128-bit digest identifying a URL.
+    
+    Args:
+        url: Normalized URL
+        
+    Returns:
+        16-byte digest stored instead of the full URL string
+    """
+    data = url.encode('utf-8')
+    if xxhash is not None:
+        return xxhash.xxh128_digest(data)
+    return hashlib.blake2b(data, digest_size=16).digest()
 
 
 class URLManager:
@@ -15,12 +43,45 @@ class URLManager:
         """
         self.start_url = self._normalize_url(start_url)
         self.base_domain = self._extract_domain(self.start_url)
-        self.visited: Set[str] = set()
-        self.processed: Set[str] = set()  # URLs that have been fully processed (PDF generated)
-        self.queue: Deque[str] = deque([self.start_url])
-        self.queued_urls: Set[str] = {self.start_url}  # Fast lookup for URLs in queue
+        # Frontier consumed by workers; None entries are shutdown sentinels
+        self._q: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        # Queued/claimed/processed flags per URL digest; every URL ever queued
+        # has an entry, so each is dequeued once
+        self._flags: Dict[bytes, int] = {_fingerprint(self.start_url): _QUEUED}
+        self._claimed_count = 0  # URLs a worker has started processing (visited)
+        self._q.put_nowait(self.start_url)
+        self._state: Optional[CrawlState] = None  # Journal for resuming interrupted crawls
+    
+    def attach_state(self, state: CrawlState) -> int:
+        """Restore the frontier of an interrupted crawl and journal changes from now on.
         
-    def _normalize_url(self, url: str) -> str:
+        Args:
+            state: Crawl state to restore from and record to
+            
+        Returns:
+            Number of pending URLs restored (0 for a fresh crawl)
+        """
+        rows = state.load()
+        self._state = state
+        if not rows:
+            state.record_enqueued(self.start_url)
+            return 0
+        
+        # Rebuild queue from the saved frontier instead of the start URL
+        self._q = asyncio.Queue()
+        self._flags = {}
+        pending = 0
+        for url, processed in rows:
+            if processed:
+                self._flags[_fingerprint(url)] = _QUEUED | _PROCESSED
+            else:
+                self._flags[_fingerprint(url)] = _QUEUED
+                self._q.put_nowait(url)
+                pending += 1
+        return pending
+        
+    @staticmethod
+    def _normalize_url(url: str) -> str:
         """Normalize URL: add protocol, remove fragment, normalize trailing slash.
         
         Args:
@@ -29,6 +90,19 @@ class URLManager:
         Returns:
             Normalized URL
         """
+        return URLManager._normalize_with_domain(url)[0]
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1 << 16)
+    def _normalize_with_domain(url: str) -> Tuple[str, str]:
+        """Normalize URL and return its domain from the same parse.
+        
+        Args:
+            url: URL to normalize
+            
+        Returns:
+            Tuple of (normalized URL, lowercase domain)
+        """
         # Add protocol if missing
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
@@ -59,9 +133,10 @@ class URLManager:
             ''  # Remove fragment
         ))
         
-        return normalized
+        return normalized, netloc
     
-    def _extract_domain(self, url: str) -> str:
+    @staticmethod
+    def _extract_domain(url: str) -> str:
         """Extract domain from URL.
         
         Args:
@@ -82,9 +157,7 @@ class URLManager:
         Returns:
             True if same domain, False otherwise
         """
-        url = self._normalize_url(url)
-        domain = self._extract_domain(url)
-        return domain == self.base_domain
+        return self._normalize_with_domain(url)[1] == self.base_domain
     
     def normalize_and_filter(self, url: str, base_url: str) -> Optional[str]:
         """Normalize URL and filter if it's from same domain.
@@ -98,14 +171,30 @@ class URLManager:
         """
         # Resolve relative URLs
         absolute_url = urljoin(base_url, url)
-        normalized = self._normalize_url(absolute_url)
+        normalized, domain = self._normalize_with_domain(absolute_url)
         
         # Filter by domain
-        if not self.is_same_domain(normalized):
+        if domain != self.base_domain:
             return None
         
         return normalized
     
+    def normalize_and_filter_absolute(self, url: str) -> Optional[str]:
+        """Normalize an absolute URL and filter if it's from same domain.
+        
+        Skips the relative URL resolution done by normalize_and_filter.
+        
+        Args:
+            url: Absolute http(s) URL to normalize and filter
+            
+        Returns:
+            Normalized URL if same domain, None otherwise
+        """
+        normalized, domain = self._normalize_with_domain(url)
+        if domain != self.base_domain:
+            return None
+        return normalized
+    
     def add_url(self, url: str) -> bool:
         """Add URL to queue if not visited and same domain.
         
@@ -116,37 +205,98 @@ class URLManager:
             True if added, False otherwise
         """
         # Ensure URL is normalized
-        normalized = self._normalize_url(url)
-        
-        # Check if already visited or processed
-        if normalized in self.visited or normalized in self.processed:
-            return False
+        normalized, domain = self._normalize_with_domain(url)
         
         # Check domain
-        if not self.is_same_domain(normalized):
+        if domain != self.base_domain:
             return False
         
-        # Check if already in queue (using set for O(1) lookup)
-        if normalized in self.queued_urls:
+        return self._enqueue(normalized)
+    
+    async def add_urls_batch(self, urls: List[str], base_url: str) -> int:
+        """Normalize a page's links off the event loop and queue the new ones.
+        
+        Args:
+            urls: Raw links extracted from a page
+            base_url: Base URL for relative URL resolution
+            
+        Returns:
+            Number of URLs added to queue
+        """
+        if not urls:
+            return 0
+        canonicals = await asyncio.to_thread(self._canonicalize_many, urls, base_url)
+        added = 0
+        for normalized in canonicals:
+            if self._enqueue(normalized):
+                added += 1
+        return added
+    
+    def _canonicalize_many(self, urls: List[str], base_url: str) -> List[str]:
+        """Normalize and filter a batch of links.
+        
+        Args:
+            urls: Raw links to normalize
+            base_url: Base URL for relative URL resolution
+            
+        Returns:
+            Normalized same-domain URLs
+        """
+        canonicals = []
+        for url in urls:
+            # Links from extract_links are already resolved by the browser
+            if url.startswith(('http://', 'https://')):
+                normalized = self.normalize_and_filter_absolute(url)
+            else:
+                normalized = self.normalize_and_filter(url, base_url)
+            if normalized:
+                canonicals.append(normalized)
+        return canonicals
+    
+    def _enqueue(self, normalized: str) -> bool:
+        """Queue a normalized same-domain URL unless it was queued before.
+        
+        Args:
+            normalized: Normalized URL
+            
+        Returns:
+            True if added, False otherwise
+        """
+        # Check if already queued, visited or processed
+        fingerprint = _fingerprint(normalized)
+        if fingerprint in self._flags:
             return False
         
-        self.queue.append(normalized)
-        self.queued_urls.add(normalized)
+        self._flags[fingerprint] = _QUEUED
+        self._q.put_nowait(normalized)
+        if self._state:
+            self._state.record_enqueued(normalized)
         return True
     
-    def get_next_url(self) -> Optional[str]:
-        """Get next URL from queue and mark as visited.
+    async def get_q(self) -> Optional[str]:
+        """Wait for the next URL in queue.
         
         Returns:
-            Next URL to process, or None if queue is empty
+            Next URL to process, or None if the crawl is shutting down
         """
-        if not self.queue:
-            return None
+        return await self._q.get()
+    
+    def is_empty(self) -> bool:
+        """Check if there are no URLs waiting in queue.
         
-        url = self.queue.popleft()
-        self.queued_urls.discard(url)  # Remove from queued set
-        self.visited.add(url)
-        return url
+        Returns:
+            True if queue is empty
+        """
+        return self._q.empty()
+    
+    def shutdown(self, workers: int) -> None:
+        """Wake up all waiting workers so they can exit.
+        
+        Args:
+            workers: Number of workers waiting on the queue
+        """
+        for _ in range(workers):
+            self._q.put_nowait(None)
     
     def get_queue_size(self) -> int:
         """Get current queue size.
@@ -154,7 +304,7 @@ class URLManager:
         Returns:
             Number of URLs in queue
         """
-        return len(self.queue)
+        return self._q.qsize()
     
     def get_visited_count(self) -> int:
         """Get number of visited URLs.
@@ -162,15 +312,28 @@ class URLManager:
         Returns:
             Number of visited URLs
         """
-        return len(self.visited)
+        return self._claimed_count
     
-    def has_more(self) -> bool:
-        """Check if there are more URLs to process.
+    def try_claim(self, url: str) -> bool:
+        """Mark URL as visited unless a worker already claimed it.
         
+        Args:
+            url: URL to claim (should already be normalized)
+            
         Returns:
-            True if queue is not empty
+            True if this call claimed the URL, False if it was claimed before
         """
-        return len(self.queue) > 0
+        # No await between the check and the update, so no other worker can interleave
+        normalized = self._normalize_url(url)
+        fingerprint = _fingerprint(normalized)
+        flags = self._flags.get(fingerprint, 0)
+        if flags & _CLAIMED:
+            return False
+        self._flags[fingerprint] = flags | _CLAIMED
+        self._claimed_count += 1
+        if self._state:
+            self._state.record_claimed(normalized)
+        return True
     
     def is_processed(self, url: str) -> bool:
         """Check if URL has been fully processed (PDF generated).
@@ -182,7 +345,7 @@ class URLManager:
             True if processed, False otherwise
         """
         normalized = self._normalize_url(url)
-        return normalized in self.processed
+        return bool(self._flags.get(_fingerprint(normalized), 0) & _PROCESSED)
     
     def mark_as_processed(self, url: str) -> None:
         """Mark URL as fully processed (PDF generated).
@@ -191,5 +354,8 @@ class URLManager:
             url: URL to mark (should already be normalized)
         """
         normalized = self._normalize_url(url)
-        self.processed.add(normalized)
+        fingerprint = _fingerprint(normalized)
+        self._flags[fingerprint] = self._flags.get(fingerprint, 0) | _PROCESSED
+        if self._state:
+            self._state.record_processed(normalized)
 
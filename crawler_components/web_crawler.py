@@ -1,88 +1,171 @@
 """This file handles page loading and link extraction using Playwright."""
 import asyncio
-from playwright.async_api import Browser, Page, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Browser, BrowserContext, Page, Route, TimeoutError as PlaywrightTimeoutError
 from typing import List, Optional
+from .adaptive_limiter import AdaptiveLimiter
 from .url_manager import URLManager
 
+# Resource types that don't affect link extraction or page text
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'font', 'media', 'stylesheet'})
+
 
 class WebCrawler:
     """Handles web page loading and link extraction."""
     
-    def __init__(self, browser: Browser, url_manager: URLManager):
+    def __init__(self, browser: Browser, url_manager: URLManager, block_assets: bool = False,
+                 limiter: Optional[AdaptiveLimiter] = None):
         """Initialize web crawler.
         
         Args:
             browser: Playwright browser instance
             url_manager: URL manager instance
+            block_assets: Abort requests for images, fonts, media and stylesheets
+            limiter: Optional adaptive limiter bounding concurrent page loads
         """
         self.browser = browser
         self.url_manager = url_manager
+        self.block_assets = block_assets
+        self.limiter = limiter
+        self.context: Optional[BrowserContext] = None
+        # Idle pages ready for the next URL; never holds more pages than there are workers
+        self._pool: "asyncio.Queue[Page]" = asyncio.Queue()
+        
+    async def start(self) -> None:
+        """Create the browser context shared by all worker pages.
+        
+        Sharing one context lets pages reuse connections, DNS/TLS sessions and cache.
+        """
+        self.context = await self.browser.new_context()
+        if self.block_assets:
+            await self.context.route('**/*', self._filter_assets)
+    
+    async def open_page(self) -> Page:
+        """Open a page in the shared context for reuse across URLs.
+        
+        Returns:
+            New page object
+        """
+        return await self.context.new_page()
+    
+    async def acquire_page(self) -> Page:
+        """Take an idle page from the pool, opening a new one if none is left.
+        
+        Returns:
+            Open page object
+        """
+        while not self._pool.empty():
+            page = self._pool.get_nowait()
+            if not page.is_closed():
+                return page
+        return await self.open_page()
+    
+    async def release_page(self, page: Page) -> None:
+        """Reset a page to about:blank and return it to the pool.
+        
+        Pages that were closed or fail to reset are dropped instead.
+        
+        Args:
+            page: Page obtained from acquire_page
+        """
+        if page.is_closed():
+            return
+        try:
+            # Unload the previous document so it doesn't keep running while idle
+            await page.goto('about:blank')
+        except (asyncio.CancelledError, KeyboardInterrupt):
+            raise
+        except Exception:
+            await self.close_page(page)
+            return
+        self._pool.put_nowait(page)
+    
+    async def close_pages(self) -> None:
+        """Close every idle page in the pool."""
+        while not self._pool.empty():
+            await self.close_page(self._pool.get_nowait())
+    
+    async def _filter_assets(self, route: Route) -> None:
+        """Abort asset requests and let everything else through.
+        
+        Args:
+            route: Intercepted request route
+        """
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def navigate(self, page: Page, url: str, timeout: int = 30000) -> bool:
+        """Navigate an existing page to a URL and wait for DOMContentLoaded.
         
-    async def load_page(self, url: str, timeout: int = 30000) -> Optional[Page]:
-        """Load a web page and wait for DOMContentLoaded.
+        Unexpected errors close the page so the caller can replace it.
+        Timeouts and 429/5xx responses are reported to the limiter as overload.
         
         Args:
+            page: Page object to reuse
             url: URL to load
             timeout: Timeout in milliseconds
             
         Returns:
-            Page object if successful, None otherwise
+            True if loaded successfully, False otherwise
         """
-        page = None
+        if self.limiter:
+            await self.limiter.acquire()
         try:
-            page = await self.browser.new_page()
-            await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
-            return page
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
+            if self.limiter:
+                if response and (response.status == 429 or response.status >= 500):
+                    self.limiter.record_overload()
+                else:
+                    self.limiter.record_success()
+            return True
         except (asyncio.CancelledError, KeyboardInterrupt):
-            # Clean up page if it was created
-            if page:
-                try:
-                    await page.close()
-                except Exception:
-                    pass
             raise
         except PlaywrightTimeoutError:
-            if page:
-                try:
-                    await page.close()
-                except Exception:
-                    pass
-            return None
+            if self.limiter:
+                self.limiter.record_overload()
+            return False
         except Exception:
-            if page:
-                try:
-                    await page.close()
-                except Exception:
-                    pass
-            return None
+            # Page may have crashed or been detached; don't reuse it
+            await self.close_page(page)
+            return False
+        finally:
+            if self.limiter:
+                self.limiter.release()
     
-    async def extract_links(self, page: Page, base_url: str) -> List[str]:
-        """Extract all links from the current page.
+    async def extract_links(self, page: Page) -> List[str]:
+        """Extract same-domain links from the current page.
+        
+        The browser resolves and filters the links with its native URL parser,
+        so off-site links never cross into Python.
         
         Args:
             page: Playwright page object
-            base_url: Base URL for resolving relative links
             
         Returns:
-            List of normalized URLs (same domain only)
+            List of absolute same-host link URLs without fragments
+            (normalized later by URLManager.add_urls_batch)
         """
         try:
-            # Get all anchor tags with href attributes
-            links = await page.evaluate("""
-                () => {
-                    const anchors = Array.from(document.querySelectorAll('a[href]'));
-                    return anchors.map(a => a.href);
+            # Get all anchor tags with href attributes on the crawled host
+            return await page.evaluate("""
+                (host) => {
+                    const links = [];
+                    for (const a of document.querySelectorAll('a[href]')) {
+                        let u;
+                        try {
+                            u = new URL(a.href, document.baseURI);
+                        } catch (e) {
+                            continue;
+                        }
+                        if ((u.protocol === 'http:' || u.protocol === 'https:') && u.host === host) {
+                            u.hash = '';
+                            links.push(u.href);
+                        }
+                    }
+                    return links;
                 }
-            """)
-            
-            # Normalize and filter links
-            valid_links = []
-            for link in links:
-                normalized = self.url_manager.normalize_and_filter(link, base_url)
-                if normalized:
-                    valid_links.append(normalized)
-            
-            return valid_links
+            """, self.url_manager.base_domain)
         
         except (asyncio.CancelledError, KeyboardInterrupt):
             # Re-raise cancellation